@@ -1,39 +1,3 @@
-def _parse_count_label(text: str) -> int | None:
-    """Parse counts such as '17', '1,234', '1.2k', '1,2 rb', '1.2 jt', '1.2m'.
-    Returns integer value or None if cannot parse.
-    """
-    try:
-        s = (text or "").strip().lower()
-        # Remove non-breaking spaces
-        s = s.replace("\xa0", " ")
-        # Find first number with optional decimal
-        import re
-        m = re.search(r"(\d+[\.,]?\d*)\s*([a-z]+)?", s)
-        if not m:
-            # fall back: all digits concatenated
-            digits = "".join(ch for ch in s if ch.isdigit())
-            return int(digits) if digits else None
-        num_str, suffix = m.group(1), (m.group(2) or "").strip()
-        num_str = num_str.replace(",", ".")
-        try:
-            val = float(num_str)
-        except Exception:
-            digits = "".join(ch for ch in num_str if ch.isdigit())
-            if not digits:
-                return None
-            val = float(digits)
-
-        mult = 1
-        if suffix in ("k", "rb"):  # thousand
-            mult = 1000
-        elif suffix in ("m", "jt"):  # million / juta
-            mult = 1_000_000
-        elif suffix in ("b", "md"):  # billion (rare)
-            mult = 1_000_000_000
-        return int(round(val * mult))
-    except Exception:
-        return None
-
 """
 Playwright Unfollow Tool (Hybrid CDP with human-like input)
 
@@ -46,15 +10,20 @@ Safe defaults: DRY_RUN=True, conservative caps and delays. Edit config below.
 """
 
 import asyncio
+import atexit
 import json
 import math
 import os
 import random
+import re
 import time
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Tuple, Optional
+from urllib.parse import urlparse
 
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import async_playwright, Page, JSHandle, ElementHandle, CDPSession
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.progress import Progress, BarColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn, SpinnerColumn
@@ -94,15 +63,89 @@ PER_HOUR_CAP: int = env_int("PER_HOUR_CAP", 30)
 MIN_DELAY_SEC: int = env_int("MIN_DELAY_SEC", 20)
 MAX_DELAY_SEC: int = env_int("MAX_DELAY_SEC", 60)
 MAX_NO_PROGRESS_ROUNDS: int = env_int("MAX_NO_PROGRESS_ROUNDS", 6)
+STATE_FLUSH_EVERY: int = env_int("STATE_FLUSH_EVERY", 5)  # persist state after this many unfollows (and on exit)
 
+# Instagram web profile endpoint (same one the web app uses); answered with the page's session cookies
+PROFILE_INFO_URL: str = "https://www.instagram.com/api/v1/users/web_profile_info/?username={username}"
+IG_WEB_APP_ID: str = "936619743392459"  # x-ig-app-id sent by instagram.com itself
+
+# Profile header link to /following/ (outside the dialog); its text carries the following count
+FOLLOWING_COUNT_LINK_SELECTOR: str = "xpath=(//a[contains(@href,'/following/')][not(ancestor::div[@role='dialog'])])[1]"
 # Selectors tuned to provided HTML: dialog + any buttons inside; filter by text/aria containing 'Following'
 FOLLOWING_DIALOG_SELECTOR: str = 'div[role="dialog"]'
 FOLLOWING_BUTTONS_SELECTOR: str = f"{FOLLOWING_DIALOG_SELECTOR} button"
-# Find first anchor link within the same row/container to extract username from href
-USERNAME_LINK_SUB_SELECTOR: str = "xpath=.//a[@role='link' and starts-with(@href, '/')][1]"
+# Passes between liveness checks of the cached dialog handle (navigation drops it immediately)
+DIALOG_RECHECK_EVERY: int = 5
+# Used when no dialog is detected: bound the scan instead of walking every button on the page
+FALLBACK_BUTTONS_SELECTOR: str = f"{FOLLOWING_BUTTONS_SELECTOR}, main button"
+# Page-side scan of button handles: one round-trip returns text/aria for every button, the
+# username from the first profile link in the nearest ancestor row that has one, and the
+# button rect plus whether its center is actually clickable (in viewport, not clipped/covered)
+ROW_SCAN_JS: str = """(buttons) => buttons.map(b => {
+    const row = b.closest('div:has(a[role="link"][href^="/"])');
+    const a = row ? row.querySelector('a[role="link"][href^="/"]') : null;
+    const href = a ? (a.getAttribute('href') || '') : '';
+    const r = b.getBoundingClientRect();
+    const hit = r.width > 0 && r.height > 0 && b.contains(document.elementFromPoint(r.x + r.width / 2, r.y + r.height / 2));
+    return {
+        t: (b.innerText || '').trim().toLowerCase(),
+        aria: (b.getAttribute('aria-label') || '').trim().toLowerCase(),
+        username: (href.split('/').filter(Boolean)[0] || '').toLowerCase(),
+        x: r.x, y: r.y, w: r.width, h: r.height, hit,
+    };
+})"""
+# Button count for the scroll-stability probe: inside the dialog handle while it is attached,
+# else document-wide by selector. args: (dialog or null, selector)
+BUTTON_COUNT_JS: str = "(root, sel) => (root && root.isConnected ? root.querySelectorAll('button') : document.querySelectorAll(sel)).length"
+# Texts of the dialog's header-like elements in one round-trip. arg: dialog
+HEADER_TEXTS_JS: str = "(dlg) => [...dlg.querySelectorAll('h4, h3, span')].map(e => e.innerText || '')"
+# Block-text check run in-page so only a boolean crosses CDP (arg: _BLOCK_RE.pattern)
+BLOCK_CHECK_JS: str = "(pat) => new RegExp(pat).test((document.body.innerText || '').toLowerCase())"
+# Post-unfollow check: the row linking to '/<u>/' shows a Follow/Ikuti button (arg: {u, pat: _FOLLOW_RE.pattern})
+VERIFY_FOLLOW_JS: str = """({u, pat}) => {
+    const followRe = new RegExp(pat, 'i');
+    const href = '/' + u + '/';
+    const a = [...document.querySelectorAll('a[role="link"]')].find(x => x.getAttribute('href') === href);
+    const row = a && a.closest('div:has(button)');
+    if (!row) return false;
+    return [...row.querySelectorAll('button')].some(b => followRe.test(b.innerText || ''));
+}"""
+# End-of-list probe: a 'Suggested for you' header in the dialog with a Follow button among the
+# next 20 buttons after it. args: (dialog, _SUGGESTED_RE.pattern, _FOLLOW_RE.pattern); returns header rect or null
+SUGGESTED_END_JS: str = """(dlg, headerPat, followPat) => {
+    const headerRe = new RegExp(headerPat, 'i'), followRe = new RegExp(followPat, 'i');
+    const text = el => el.innerText || '';
+    const buttons = dlg.querySelectorAll('button');
+    for (const h of dlg.querySelectorAll('h4, h3, span')) {
+        if (!headerRe.test(text(h))) continue;
+        let checked = 0;
+        for (const b of buttons) {
+            const pos = h.compareDocumentPosition(b);
+            if (!(pos & Node.DOCUMENT_POSITION_FOLLOWING) || (pos & Node.DOCUMENT_POSITION_CONTAINED_BY)) continue;
+            if (followRe.test(text(b))) {
+                const r = h.getBoundingClientRect();
+                return {x: r.x, y: r.y, width: r.width, height: r.height};
+            }
+            if (++checked >= 20) break;
+        }
+    }
+    return null;
+}"""
+# Debug overlay drawn around the element about to be clicked
+HIGHLIGHT_JS: str = (
+    "(x,y,w,h,color,dur)=>{"
+    "const id='cascade-hl-'+Math.random().toString(36).slice(2);"
+    "const d=document.createElement('div');"
+    "d.id=id; d.style.cssText=\"position:fixed;pointer-events:none;z-index:2147483647;\"+"
+    "`left:${x}px;top:${y}px;width:${w}px;height:${h}px;`+"
+    "`border:2px solid ${color};border-radius:8px;box-shadow:0 0 8px ${color};`;"
+    "document.body.appendChild(d);"
+    "setTimeout(()=>{const el=document.getElementById(id);if(el)el.remove();}, dur);"
+    "}"
+)
 
 # Detection strings (lowercase)
-BLOCK_PATTERNS = [
+BLOCK_PATTERNS = frozenset({
     "we limit how often",
     "action blocked",
     "try again later",
@@ -110,26 +153,64 @@ BLOCK_PATTERNS = [
     "we've detected",
     "please verify",
     "challenge_required",
-]
+})
 
 # Localization tokens (English + Indonesian)
 # Buttons in list dialog
-FOLLOWING_TOKENS = ("following", "mengikuti")
-FOLLOW_TOKENS = ("follow", "ikuti")
+FOLLOWING_TOKENS = frozenset({"following", "mengikuti"})
+FOLLOW_TOKENS = frozenset({"follow", "ikuti"})
 # Confirm dialog
-CONFIRM_UNFOLLOW_TOKENS = ("unfollow", "berhenti mengikuti", "berhenti mengikut", "berhenti")
-CANCEL_TOKENS = ("cancel", "batal")
+CONFIRM_UNFOLLOW_TOKENS = frozenset({"unfollow", "berhenti mengikuti", "berhenti mengikut", "berhenti"})
+CANCEL_TOKENS = frozenset({"cancel", "batal"})
 # Header that marks end of real following list
-SUGGESTED_HEADER_TOKENS = (
+SUGGESTED_HEADER_TOKENS = frozenset({
     "suggested for you",
     "disarankan",
     "disarankan untuk anda",
     "disarankan untuk kamu",
     "disarankan untukmu",
-)
+})
+
+# Precompiled patterns for count labels ('1,234', '1.2k', '1,2 rb', ...)
+_COUNT_RE = re.compile(r"(\d+[.,]?\d*)\s*([a-z]+)?")
+_NON_DIGIT_RE = re.compile(r"\D+")
+_SUFFIX_MULT = {
+    "k": 1000, "rb": 1000,                    # thousand / ribu
+    "m": 1_000_000, "jt": 1_000_000,          # million / juta
+    "b": 1_000_000_000, "md": 1_000_000_000,  # billion (rare)
+}
+
+
+def _token_re(tokens, flags: int = 0) -> re.Pattern:
+    """Compile localization tokens into one alternation; .search() == any(tok in text).
+
+    Spaces inside a token match any whitespace run, so raw innerText needs no .strip()/normalising.
+    """
+    return re.compile("|".join(r"\s+".join(map(re.escape, t.split())) for t in sorted(tokens)), flags)
+
+
+_FOLLOWING_RE = _token_re(FOLLOWING_TOKENS)
+_FOLLOW_RE = _token_re(FOLLOW_TOKENS, re.I)
+_CONFIRM_RE = _token_re(CONFIRM_UNFOLLOW_TOKENS, re.I)
+_SUGGESTED_RE = _token_re(SUGGESTED_HEADER_TOKENS, re.I)
+_BLOCK_RE = _token_re(BLOCK_PATTERNS)
 
 # -------------------- UTILITIES --------------------
 
+_LOG_FH = None
+_LOG_QUEUE: Optional[asyncio.Queue] = None  # set while the background writer is running
+LOG_FLUSH_INTERVAL_SEC = 0.2
+
+
+def _get_log_fh():
+    """Open LOG_FILE once (line-buffered, so every line still hits disk) and reuse it."""
+    global _LOG_FH
+    if _LOG_FH is None:
+        _LOG_FH = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
+
+
 def log(msg: str, style: str | None = None) -> None:
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{ts}] {msg}"
@@ -137,21 +218,41 @@ def log(msg: str, style: str | None = None) -> None:
         console.print(line, style=style)
     else:
         console.print(line)
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+    if _LOG_QUEUE is not None:
+        _LOG_QUEUE.put_nowait(line)
+    else:
+        _get_log_fh().write(line + "\n")
+
 
+async def _log_writer(queue: asyncio.Queue) -> None:
+    """Append queued log lines to LOG_FILE, one write per LOG_FLUSH_INTERVAL_SEC batch."""
+    fh = _get_log_fh()
+    while True:
+        lines = [await queue.get()]
+        try:
+            await asyncio.sleep(LOG_FLUSH_INTERVAL_SEC)
+            while not queue.empty():
+                lines.append(queue.get_nowait())
+            fh.write("\n".join(lines) + "\n")
+        except Exception:
+            pass
+        finally:
+            # every dequeued line is marked done so queue.join() in main() can't hang
+            for _ in lines:
+                queue.task_done()
 
-def load_whitelist() -> set[str]:
+
+def load_whitelist() -> frozenset[str]:
     p = Path(WHITELIST_FILE)
     if not p.exists():
         p.write_text(json.dumps(["friend_one", "brand_abc"], indent=2))
         log(f"Created template {WHITELIST_FILE}. Edit it and re-run.")
     try:
         arr = json.loads(p.read_text())
-        return {str(s).strip().lower().lstrip('@') for s in arr}
+        return frozenset(str(s).strip().lower().lstrip('@') for s in arr)
     except Exception as e:
         log(f"Failed to read whitelist: {e}")
-        return set()
+        return frozenset()
 
 
 def load_state() -> dict:
@@ -166,47 +267,135 @@ def load_state() -> dict:
 
 
 def save_state(state: dict) -> None:
-    Path(STATE_FILE).write_text(json.dumps(state, indent=2))
+    # write to a temp file and rename so a crash mid-write never leaves a truncated state file
+    tmp = Path(STATE_FILE + ".tmp")
+    tmp.write_text(json.dumps(state, separators=(",", ":")))
+    os.replace(tmp, STATE_FILE)
 
 
 def today_key() -> str:
     return time.strftime("%Y-%m-%d")
 
 
+def next_midnight() -> float:
+    """Epoch seconds of the next local midnight, i.e. when today_key() rolls over."""
+    lt = time.localtime()
+    return time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+
 def killswitch_triggered() -> bool:
     return Path(KILLSWITCH_FILE).exists()
 
 
+_JS_FN_CACHE: dict[Page, dict[str, JSHandle]] = {}
+
+
+async def _call_js(page: Page, source: str, *args):
+    """Call a page-side JS function, compiling its source only once per document.
+    The function handle is cached per page and re-created when it goes stale (e.g. after navigation).
+    """
+    fns = _JS_FN_CACHE.setdefault(page, {})
+    fn = fns.get(source)
+    if fn is not None:
+        try:
+            return await fn.evaluate("(f, args) => f(...args)", list(args))
+        except Exception:
+            fns.pop(source, None)
+    fn = await page.evaluate_handle(f"() => ({source})")
+    fns[source] = fn
+    return await fn.evaluate("(f, args) => f(...args)", list(args))
+
+
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+
+def _fire_and_forget(coro) -> None:
+    """Schedule coro without awaiting it (keeps a reference until done so it isn't GC'd mid-flight)."""
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+async def _block_text_present(page: Page) -> bool:
+    """True if any BLOCK_PATTERNS text is on the page; scans the full body without transferring it."""
+    return bool(await _call_js(page, BLOCK_CHECK_JS, _BLOCK_RE.pattern))
+
+
 async def _highlight_box(page: Page, box: dict, color: str = "#ff3b30", duration_ms: int = 600) -> None:
+    # the overlay removes itself via an in-page timer; callers only pay one round-trip
     if not DEBUG_HIGHLIGHT or not box:
         return
     x, y, w, h = box.get("x"), box.get("y"), box.get("width"), box.get("height")
     if x is None or y is None or w is None or h is None:
         return
-    script = (
-        "(x,y,w,h,color,dur)=>{"
-        "const id='cascade-hl-'+Math.random().toString(36).slice(2);"
-        "const d=document.createElement('div');"
-        "d.id=id; d.style.cssText=\"position:fixed;pointer-events:none;z-index:2147483647;\"+"
-        "`left:${x}px;top:${y}px;width:${w}px;height:${h}px;`+"
-        "`border:2px solid ${color};border-radius:8px;box-shadow:0 0 8px ${color};`;"
-        "document.body.appendChild(d);"
-        "setTimeout(()=>{const el=document.getElementById(id);if(el)el.remove();}, dur);"
-        "}"
-    )
     try:
-        await page.evaluate(script, x, y, w, h, color, duration_ms)
+        await _call_js(page, HIGHLIGHT_JS, x, y, w, h, color, duration_ms)
     except Exception:
         pass
 
 
+@lru_cache(maxsize=64)
+def _parse_count_label(text: str) -> int | None:
+    """Parse counts such as '17', '1,234', '1.2k', '1,2 rb', '1.2 jt', '1.2m'.
+    Returns integer value or None if cannot parse.
+    """
+    try:
+        s = (text or "").strip().lower()
+        # Remove non-breaking spaces
+        s = s.replace("\xa0", " ")
+        # Find first number with optional decimal
+        m = _COUNT_RE.search(s)
+        if not m:
+            # fall back: all digits concatenated
+            digits = _NON_DIGIT_RE.sub("", s)
+            return int(digits) if digits else None
+        num_str, suffix = m.group(1), (m.group(2) or "").strip()
+        num_str = num_str.replace(",", ".")
+        try:
+            val = float(num_str)
+        except Exception:
+            digits = _NON_DIGIT_RE.sub("", num_str)
+            if not digits:
+                return None
+            val = float(digits)
+
+        mult = _SUFFIX_MULT.get(suffix, 1)
+        return int(round(val * mult))
+    except Exception:
+        return None
+
+
+def _profile_username(url: str) -> str:
+    """Profile name from an instagram.com URL such as '/<user>/' or '/<user>/following/'; '' otherwise."""
+    parsed = urlparse(url)
+    if not parsed.netloc.endswith("instagram.com"):
+        return ""
+    return parsed.path.strip("/").split("/")[0].lower()
+
+
+async def _get_following_count_api(page: Page, username: str) -> Optional[int]:
+    """Read the following count from the web profile endpoint (one request, no DOM or reload).
+    Returns int or None if the request fails or the payload shape is unexpected.
+    """
+    if not username:
+        return None
+    try:
+        resp = await page.request.get(PROFILE_INFO_URL.format(username=username), headers={"x-ig-app-id": IG_WEB_APP_ID})
+        if not resp.ok:
+            return None
+        data = await resp.json()
+        return int(data["data"]["user"]["edge_follow"]["count"])
+    except Exception:
+        return None
+
+
 async def _get_following_count(page: Page) -> Optional[int]:
     """Try to read the profile 'following' count from the page header.
     Returns int or None if not found. Works with different locales by stripping non-digits.
     """
     try:
         # Prefer anchors outside dialog that link to /following/
-        el = await page.query_selector("xpath=(//a[contains(@href,'/following/')][not(ancestor::div[@role='dialog'])])[1]")
+        el = await page.query_selector(FOLLOWING_COUNT_LINK_SELECTOR)
         if not el:
             return None
         txt = ((await el.inner_text()) or "").strip()
@@ -227,6 +416,27 @@ async def _get_following_count(page: Page) -> Optional[int]:
     except Exception:
         return None
 
+async def _live_dialog(page: Page, dlg: Optional[ElementHandle]) -> Optional[ElementHandle]:
+    """Return the cached dialog handle if still attached to the DOM, else re-query the dialog."""
+    try:
+        if dlg is not None and await dlg.evaluate("el => el.isConnected"):
+            return dlg
+    except Exception:
+        pass
+    try:
+        return await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
+    except Exception:
+        return None
+
+async def _suggested_end_box(page: Page, dlg: Optional[ElementHandle]) -> Optional[dict]:
+    """Box of the 'Suggested for you' header if Follow buttons follow it (end of the real list), else None."""
+    if dlg is None:
+        return None
+    try:
+        return await _call_js(page, SUGGESTED_END_JS, dlg, _SUGGESTED_RE.pattern, _FOLLOW_RE.pattern)
+    except Exception:
+        return None
+
 async def _close_dialog_if_open(page: Page) -> None:
     try:
         dlg = await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
@@ -236,37 +446,70 @@ async def _close_dialog_if_open(page: Page) -> None:
     except Exception:
         pass
 
-# -------------------- HUMAN-LIKE CURSOR --------------------
-
-def _bezier(points: List[Tuple[float, float]], t: float) -> Tuple[float, float]:
-    pts = points[:]
-    while len(pts) > 1:
-        nxt: list[Tuple[float, float]] = []
-        for i in range(len(pts) - 1):
-            x = pts[i][0] + (pts[i + 1][0] - pts[i][0]) * t
-            y = pts[i][1] + (pts[i + 1][1] - pts[i][1]) * t
-            nxt.append((x, y))
-        pts = nxt
-    return pts[0]
+async def _following_count_after_run(page: Page, username: str) -> Optional[int]:
+    """Following count after the run: API first; reload and scrape the header only if that fails."""
+    count = await _get_following_count_api(page, username)
+    if count is not None:
+        return count
+    return await _reload_and_count(page)
+
+async def _reload_and_count(page: Page) -> Optional[int]:
+    """Reload the page and read the following count, retrying while the header renders."""
+    # Instagram keeps long-lived requests open, so networkidle can stall for many seconds;
+    # wait for the DOM and the one header link we read instead
+    try:
+        await page.reload(wait_until="domcontentloaded")
+        await page.wait_for_selector(FOLLOWING_COUNT_LINK_SELECTOR, timeout=3000)
+    except Exception:
+        pass
+    # geometric backoff between five attempts: the header is usually there right away;
+    # worst case waits ~0.75s and doesn't sleep after the last miss
+    count = await _get_following_count(page)
+    for delay in (0.05, 0.1, 0.2, 0.4):
+        if count is not None:
+            return count
+        await asyncio.sleep(delay)
+        count = await _get_following_count(page)
+    return count
 
+# -------------------- HUMAN-LIKE CURSOR --------------------
 
 def generate_curved_path(x0: float, y0: float, x1: float, y1: float, steps: int = 28) -> List[Tuple[float, float]]:
     mx = (x0 + x1) / 2 + (random.random() - 0.5) * 80
     my = (y0 + y1) / 2 + (random.random() - 0.5) * 40
-    p0 = (x0, y0)
-    p1 = (mx, my)
-    p2 = (x1, y1)
     path: List[Tuple[float, float]] = []
     for i in range(steps + 1):
         t = i / steps
         tt = 0.5 - 0.5 * math.cos(math.pi * t)
-        x, y = _bezier([p0, p1, p2], tt)
+        # closed-form quadratic Bezier: (x0,y0) -> control (mx,my) -> (x1,y1)
+        u = 1 - tt
+        x = u * u * x0 + 2 * u * tt * mx + tt * tt * x1
+        y = u * u * y0 + 2 * u * tt * my + tt * tt * y1
         jitter_scale = (1 - abs(2 * t - 1))
         x += (random.random() - 0.5) * 3 * jitter_scale
         y += (random.random() - 0.5) * 3 * jitter_scale
         path.append((x, y))
     return path
 
+
+async def move_mouse_along(client: CDPSession, path: List[Tuple[float, float]], step_delay: Tuple[float, float]) -> Tuple[float, float]:
+    """Dispatch mouseMoved events along path in three pipelined bursts (start, middle, end).
+    Each burst is sent with asyncio.gather, then we sleep for the sum of its per-step delays,
+    so total movement time matches stepping point by point. Returns the final cursor position.
+    """
+    n = len(path)
+    bounds = (0, n // 3, 2 * n // 3, n)
+    for lo, hi in zip(bounds, bounds[1:]):
+        chunk = path[lo:hi]
+        if not chunk:
+            continue
+        await asyncio.gather(*(
+            client.send("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": px, "y": py})
+            for (px, py) in chunk
+        ))
+        await asyncio.sleep(sum(random.uniform(*step_delay) for _ in chunk))
+    return path[-1]
+
 # -------------------- CORE --------------------
 
 async def connect_instagram_page() -> tuple[Optional[Page], Optional[object]]:
@@ -301,14 +544,29 @@ async def connect_instagram_page() -> tuple[Optional[Page], Optional[object]]:
     return page, pw
 
 
+async def _load_more_rows(client: CDPSession, last_following: Optional[ElementHandle], scroll_x: float, scroll_y: float) -> None:
+    """Load more rows: prefer scrolling the last 'Following' button into view to keep position stable,
+    else wheel-scroll at the dialog anchor; then give the list time to fetch."""
+    try:
+        if last_following:
+            await last_following.scroll_into_view_if_needed()
+            await asyncio.sleep(random.uniform(0.8, 1.4))
+        else:
+            await client.send("Input.dispatchMouseEvent", {"type": "mouseWheel", "x": scroll_x, "y": scroll_y, "deltaX": 0, "deltaY": random.randint(320, 520)})
+            await asyncio.sleep(random.uniform(0.9, 1.4))
+    except Exception:
+        pass
+
+
 async def run_once() -> None:
     whitelist = load_whitelist()
     state = load_state()
     today = today_key()
+    day_ends_at = next_midnight()
     state.setdefault("daily_unfollows", {})
-    state["daily_unfollows"].setdefault(today, 0)
+    daily_count = state["daily_unfollows"].setdefault(today, 0)
 
-    if state["daily_unfollows"][today] >= DAILY_CAP:
+    if daily_count >= DAILY_CAP:
         log("Daily cap already reached. Exiting.")
         return
 
@@ -317,6 +575,7 @@ async def run_once() -> None:
         return
 
     client = await page.context.new_cdp_session(page)
+    profile_user = _profile_username(page.url)
 
     # start mouse pos at viewport center
     vp = page.viewport_size or {"width": 1200, "height": 800}
@@ -329,6 +588,7 @@ async def run_once() -> None:
     # ensure following dialog exists (fallback to page-level if not found)
     has_dialog = True
     dialog_bbox = None
+    dlg_handle: Optional[ElementHandle] = None
     try:
         await page.wait_for_selector(FOLLOWING_DIALOG_SELECTOR, timeout=5000)
     except Exception:
@@ -338,9 +598,9 @@ async def run_once() -> None:
     # position mouse in the dialog to ensure wheel scroll affects it
     if has_dialog:
         try:
-            dlg = await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
-            if dlg:
-                db = await dlg.bounding_box()
+            dlg_handle = await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
+            if dlg_handle:
+                db = await dlg_handle.bounding_box()
                 if db:
                     mouse_x = db["x"] + db["width"] / 2
                     mouse_y = db["y"] + min(100, db["height"] / 2)
@@ -349,15 +609,32 @@ async def run_once() -> None:
         except Exception:
             pass
 
+    def _drop_dialog_on_nav(frame) -> None:
+        nonlocal dlg_handle
+        if frame == page.main_frame:
+            dlg_handle = None
+
+    page.on("framenavigated", _drop_dialog_on_nav)
+
+    # scoped, lazily-evaluated button locator (first dialog only; bounded fallback without one)
+    if has_dialog:
+        buttons_selector = FOLLOWING_BUTTONS_SELECTOR
+        buttons_loc = page.locator(FOLLOWING_DIALOG_SELECTOR).first.locator("button")
+    else:
+        buttons_selector = FALLBACK_BUTTONS_SELECTOR
+        buttons_loc = page.locator(FALLBACK_BUTTONS_SELECTOR)
+
     # summary counters
     actions = 0
     stable_no_new = 0
     last_visible = 0
     start_time = time.time()
-    recent_actions: list[float] = []  # timestamps of real unfollows
+    recent_actions: deque[float] = deque()  # timestamps of real unfollows, oldest first
     seen_usernames: set[str] = set()
     unfollowed_usernames: list[str] = []
-    before_count = await _get_following_count(page)
+    before_count = await _get_following_count_api(page, profile_user)
+    if before_count is None:
+        before_count = await _get_following_count(page)
 
     # Setup progress bar (indeterminate if before_count is unknown)
     bar = BarColumn(bar_width=None, pulse=True)
@@ -374,150 +651,111 @@ async def run_once() -> None:
     )
     progress.start()
     task_total = before_count if before_count is not None else None
-    task = progress.add_task("run", total=task_total, fields={"detail": "initializing..."})
+    task = progress.add_task("run", total=task_total, detail="initializing...")
+    total_set = task_total is not None
     processed_usernames: set[str] = set()  # usernames either unfollowed or skipped (whitelist)
     skipped_whitelist_usernames: list[str] = []
     no_action_rounds = 0
+    rounds = 0
+    last_counts: tuple = ()  # counters behind the cached progress detail string
+    detail = ""
+    unsaved = 0  # real unfollows not yet written to STATE_FILE
+    prefetch: Optional[asyncio.Task] = None  # next-rows load started early for the current pass
 
-    while True:
-        if killswitch_triggered():
-            log("Killswitch detected. Stopping run.", style="bold red")
-            break
-        if actions >= MAX_ACTIONS_PER_RUN:
-            log("Reached MAX_ACTIONS_PER_RUN. Stopping run.", style="yellow")
-            break
-        if state["daily_unfollows"][today] >= DAILY_CAP:
-            log("Reached DAILY_CAP. Stopping run.", style="yellow")
-            break
-        # per-hour cap check (actual actions within last 3600s)
-        now = time.time()
-        recent_actions = [t for t in recent_actions if now - t < 3600]
-        if len(recent_actions) >= PER_HOUR_CAP:
-            log("Reached PER_HOUR_CAP (last 60 minutes). Stopping run.", style="yellow")
-            break
-
-        # enumerate all buttons in dialog (or whole page if no dialog); filter to 'Following'
-        processed_before = len(processed_usernames)
-        actions_before_loop = actions
-        buttons_selector = FOLLOWING_BUTTONS_SELECTOR if has_dialog else "button"
-        raw_buttons = await page.query_selector_all(buttons_selector)
-        if not raw_buttons:
-            # try scrolling a bit to load
-            await client.send("Input.dispatchMouseEvent", {"type": "mouseWheel", "x": scroll_x, "y": scroll_y, "deltaX": 0, "deltaY": random.randint(320, 480)})
-            await asyncio.sleep(1.2)
-            stable_no_new += 1
-            # check if we've reached the 'Suggested for you' section inside dialog
-            if has_dialog:
-                try:
-                    dlg = await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
-                    if dlg:
-                        headers = await dlg.query_selector_all("h4, h3, span")
-                        for h in headers:
-                            try:
-                                ht = ((await h.inner_text()) or "").strip().lower()
-                            except Exception:
-                                ht = ""
-                            if any(tok in ht for tok in SUGGESTED_HEADER_TOKENS):
-                                log("Reached 'Suggested for you' section. Ending.", style="cyan")
-                                stable_no_new = 999  # force break
-                                break
-                except Exception:
-                    pass
-            if stable_no_new >= MAX_NO_PROGRESS_ROUNDS:
-                log("No buttons found after multiple scrolls. Ending.", style="yellow")
+    try:
+        while True:
+            if killswitch_triggered():
+                log("Killswitch detected. Stopping run.", style="bold red")
+                break
+            if actions >= MAX_ACTIONS_PER_RUN:
+                log("Reached MAX_ACTIONS_PER_RUN. Stopping run.", style="yellow")
+                break
+            # day key only changes at local midnight; no need to re-format it every pass
+            if time.time() >= day_ends_at:
+                today = today_key()
+                day_ends_at = next_midnight()
+                daily_count = state["daily_unfollows"].setdefault(today, 0)
+            if daily_count >= DAILY_CAP:
+                log("Reached DAILY_CAP. Stopping run.", style="yellow")
+                break
+            # per-hour cap check (actual actions within last 3600s)
+            now = time.time()
+            while recent_actions and now - recent_actions[0] >= 3600:
+                recent_actions.popleft()
+            if len(recent_actions) >= PER_HOUR_CAP:
+                log("Reached PER_HOUR_CAP (last 60 minutes). Stopping run.", style="yellow")
                 break
-            progress.update(task, fields={"detail": f"scrolling ({stable_no_new})"})
-            continue
-        else:
-            stable_no_new = 0
 
-        # Build filtered list of 'Following/Mengikuti' buttons only
-        following_btns = []
-        for b in raw_buttons:
+            # keep the dialog handle across iterations: dropped on navigation, otherwise
+            # re-verified (and re-acquired if detached) every DIALOG_RECHECK_EVERY passes
+            rounds += 1
+            if has_dialog and (dlg_handle is None or rounds % DIALOG_RECHECK_EVERY == 0):
+                dlg_handle = await _live_dialog(page, dlg_handle)
+
+            # enumerate all buttons in dialog (or whole page if no dialog); filter to 'Following'
+            prefetch = None
+            processed_before = len(processed_usernames)
+            actions_before_loop = actions
+            raw_buttons = await buttons_loc.element_handles()
+            if not raw_buttons:
+                # try scrolling a bit to load
+                await client.send("Input.dispatchMouseEvent", {"type": "mouseWheel", "x": scroll_x, "y": scroll_y, "deltaX": 0, "deltaY": random.randint(320, 480)})
+                await asyncio.sleep(1.2)
+                stable_no_new += 1
+                # check if we've reached the 'Suggested for you' section inside dialog
+                if has_dialog and dlg_handle:
+                    try:
+                        header_texts = await _call_js(page, HEADER_TEXTS_JS, dlg_handle)
+                    except Exception:
+                        header_texts = []
+                    # \s+ in the tokens never matches NUL, so one search over the joined texts can't span two headers
+                    if _SUGGESTED_RE.search("\0".join(header_texts)):
+                        log("Reached 'Suggested for you' section. Ending.", style="cyan")
+                        stable_no_new = 999  # force break
+                if stable_no_new >= MAX_NO_PROGRESS_ROUNDS:
+                    log("No buttons found after multiple scrolls. Ending.", style="yellow")
+                    break
+                progress.update(task, detail=f"scrolling ({stable_no_new})")
+                continue
+            else:
+                stable_no_new = 0
+
+            # Build filtered list of 'Following/Mengikuti' buttons only (texts fetched in one batch)
             try:
-                t0 = ((await b.inner_text()) or "").strip().lower()
+                rows = await _call_js(page, ROW_SCAN_JS, raw_buttons)
             except Exception:
-                t0 = ""
-            is_following = any(tok in t0 for tok in FOLLOWING_TOKENS)
-            if not is_following:
-                try:
-                    aria0 = ((await b.get_attribute("aria-label")) or "").strip().lower()
-                except Exception:
-                    aria0 = ""
-                if any(tok in aria0 for tok in FOLLOWING_TOKENS):
-                    is_following = True
-            if is_following:
-                following_btns.append(b)
-
-        if not following_btns:
-            # If no following buttons are left in view, check for Suggested header to finish
-            if has_dialog:
+                rows = []
+            rects_stale = False  # set once anything may have moved the rows since this scan
+            following_btns = [
+                (b, r) for b, r in zip(raw_buttons, rows)
+                if _FOLLOWING_RE.search(r["t"]) or _FOLLOWING_RE.search(r["aria"])
+            ]
+
+            if not following_btns:
+                # If no following buttons are left in view, check for Suggested header to finish
+                if has_dialog:
+                    hbox = await _suggested_end_box(page, dlg_handle)
+                    if hbox:
+                        _fire_and_forget(_highlight_box(page, hbox, "#0a84ff", 800))
+                        log("Detected 'Suggested for you' with Follow buttons after it — finishing.")
+                        stable_no_new = 999
+                if stable_no_new > 6:
+                    log("No 'Following' buttons visible after multiple scrolls. Ending.")
+                    break
+
+                # try small scroll within dialog to load more rows
                 try:
-                    dlg = await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
-                    if dlg:
-                        headers = await dlg.query_selector_all("h4, h3, span")
-                        for h in headers:
-                            try:
-                                ht = ((await h.inner_text()) or "").strip().lower()
-                            except Exception:
-                                ht = ""
-                            if any(tok in ht for tok in SUGGESTED_HEADER_TOKENS):
-                                # confirm one follow/ikuti button exists after header
-                                suggested_reached = False
-                                try:
-                                    btns_after = await h.query_selector_all("xpath=following::button")
-                                    for bb in btns_after[:20]:  # bounded scan
-                                        try:
-                                            tbb = ((await bb.inner_text()) or "").strip().lower()
-                                        except Exception:
-                                            tbb = ""
-                                        if any(tt in tbb for tt in FOLLOW_TOKENS):
-                                            suggested_reached = True
-                                            break
-                                except Exception:
-                                    pass
-                                if suggested_reached:
-                                    hbox = await h.bounding_box()
-                                    await _highlight_box(page, hbox, "#0a84ff", 800)
-                                    log("Detected 'Suggested for you' with Follow buttons after it — finishing.")
-                                    stable_no_new = 999
-                                    break
+                    await client.send("Input.dispatchMouseEvent", {"type": "mouseWheel", "x": scroll_x, "y": scroll_y, "deltaX": 0, "deltaY": random.randint(280, 420)})
+                    await asyncio.sleep(1.0)
                 except Exception:
                     pass
-            if stable_no_new > 6:
-                log("No 'Following' buttons visible after multiple scrolls. Ending.")
-                break
-
-            # try small scroll within dialog to load more rows
-            try:
-                await client.send("Input.dispatchMouseEvent", {"type": "mouseWheel", "x": scroll_x, "y": scroll_y, "deltaX": 0, "deltaY": random.randint(280, 420)})
-                await asyncio.sleep(1.0)
-            except Exception:
-                pass
-            continue
-
-        for btn in following_btns:
-            if killswitch_triggered():
-                log("Killswitch detected during item loop.")
-                break
-            if actions >= MAX_ACTIONS_PER_RUN:
-                log("Reached MAX_ACTIONS_PER_RUN inside loop.")
-                break
+                continue
 
-            try:
-                # for logging only
-                btn_text = ((await btn.inner_text()) or "").strip().lower()
-
-                # find username by nearest ancestor container and first link within it
-                container = await btn.query_selector("xpath=ancestor-or-self::div[.//a[@role='link' and starts-with(@href, '/')]][1]")
-                link = None
-                if container:
-                    link = await container.query_selector(USERNAME_LINK_SUB_SELECTOR)
-                if not link:
-                    continue
-                href = (await link.get_attribute("href")) or ""
-                username = href.strip("/").split("/")[0].lower()
-                if not username:
+            # Whitelist/seen filtering is plain set membership on the scanned rows; only survivors get DOM work
+            candidates = []
+            for btn, row in following_btns:
+                username = row["username"]
+                if not username or username in seen_usernames:
                     continue
                 if username in whitelist:
                     if username not in processed_usernames:
@@ -526,263 +764,241 @@ async def run_once() -> None:
                         processed_usernames.add(username)
                         seen_usernames.add(username)
                     continue
-                if username in seen_usernames:
-                    # already processed/considered this one this run
-                    continue
+                candidates.append((btn, row))
 
-                # ensure the button is visible within dialog
-                try:
-                    await btn.scroll_into_view_if_needed()
-                    await btn.evaluate("el => el.scrollIntoView({block: 'center'})")
-                except Exception:
-                    pass
+            for btn, row in candidates:
+                if killswitch_triggered():
+                    log("Killswitch detected during item loop.")
+                    break
+                if actions >= MAX_ACTIONS_PER_RUN:
+                    log("Reached MAX_ACTIONS_PER_RUN inside loop.")
+                    break
 
-                # compute button center
-                box = await btn.bounding_box()
-                if not box:
-                    continue
-                bx = box["x"] + box["width"] / 2
-                by = box["y"] + box["height"] / 2
-
-                await _highlight_box(page, box, "#ffd60a", 700)
-
-                log(f"[Target] {username} | btn='{btn_text}'", style="cyan")
-                seen_usernames.add(username)
-
-                # move cursor along curved path
-                for (px, py) in generate_curved_path(mouse_x, mouse_y, bx, by, steps=random.randint(20, 32)):
-                    await client.send("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": px, "y": py})
-                    await asyncio.sleep(random.uniform(0.008, 0.03))
-                    mouse_x, mouse_y = px, py
-
-                await asyncio.sleep(random.uniform(0.08, 0.45))
-
-                if DRY_RUN:
-                    log(f"[DRY_RUN] Would click 'Following' for {username} (then confirm Unfollow)")
-                else:
-                    # click press + release
-                    await client.send("Input.dispatchMouseEvent", {"type": "mousePressed", "x": bx, "y": by, "button": "left", "clickCount": 1})
-                    await asyncio.sleep(random.uniform(0.06, 0.18))
-                    await client.send("Input.dispatchMouseEvent", {"type": "mouseReleased", "x": bx, "y": by, "button": "left", "clickCount": 1})
-                    log(f"Clicked initial button for {username}", style="green")
-
-                    # wait & detect confirm dialog
-                    await asyncio.sleep(random.uniform(0.6, 1.2))
-                    body_text = (await page.inner_text("body")).lower()
-                    if any(p in body_text for p in BLOCK_PATTERNS):
-                        log("Block-like text detected. Stopping.", style="bold red")
+                try:
+                    # for logging only
+                    btn_text = row["t"]
+
+                    username = row["username"]
+                    if username in seen_usernames:
+                        # duplicate row for a username already targeted in this batch
+                        continue
+
+                    # reuse the scanned rect if the button was clickable in place and nothing has
+                    # scrolled or been clicked since the scan; otherwise scroll it into view and re-measure
+                    if row["hit"] and not rects_stale:
+                        box = {"x": row["x"], "y": row["y"], "width": row["w"], "height": row["h"]}
+                    else:
                         try:
-                            progress.stop()
+                            await btn.scroll_into_view_if_needed()
+                            await btn.evaluate("el => el.scrollIntoView({block: 'center'})")
                         except Exception:
                             pass
-                        await client.detach()
-                        return
+                        rects_stale = True
 
-                    # find confirm button by label text
-                    confirm_btn = None
-                    for c in await page.query_selector_all("button"):
-                        try:
-                            t = ((await c.inner_text()) or "").strip().lower()
-                        except Exception:
-                            t = ""
-                        if any(k in t for k in ("unfollow", "berhenti mengikuti", "berhenti")):
-                            confirm_btn = c
-                            break
+                        # compute button center
+                        box = await btn.bounding_box()
+                        if not box:
+                            continue
+                    bx = box["x"] + box["width"] / 2
+                    by = box["y"] + box["height"] / 2
 
-                    if confirm_btn:
-                        cbox = await confirm_btn.bounding_box()
-                        if cbox:
-                            cbx = cbox["x"] + cbox["width"] / 2
-                            cby = cbox["y"] + cbox["height"] / 2
-                            await _highlight_box(page, cbox, "#34c759", 700)
-                            for (px, py) in generate_curved_path(mouse_x, mouse_y, cbx, cby, steps=random.randint(12, 20)):
-                                await client.send("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": px, "y": py})
-                                await asyncio.sleep(random.uniform(0.008, 0.02))
-                                mouse_x, mouse_y = px, py
-                            await asyncio.sleep(random.uniform(0.06, 0.2))
-                            await client.send("Input.dispatchMouseEvent", {"type": "mousePressed", "x": cbx, "y": cby, "button": "left", "clickCount": 1})
-                            await asyncio.sleep(random.uniform(0.06, 0.2))
-                            await client.send("Input.dispatchMouseEvent", {"type": "mouseReleased", "x": cbx, "y": cby, "button": "left", "clickCount": 1})
-                            log("Clicked confirm unfollow", style="green")
-                        else:
-                            log("Confirm button bbox missing; skipped confirm.", style="yellow")
+                    await _highlight_box(page, box, "#ffd60a", 700)
+
+                    log(f"[Target] {username} | btn='{btn_text}'", style="cyan")
+                    seen_usernames.add(username)
+
+                    # move cursor along curved path
+                    path = generate_curved_path(mouse_x, mouse_y, bx, by, steps=random.randint(20, 32))
+                    mouse_x, mouse_y = await move_mouse_along(client, path, (0.008, 0.03))
+
+                    await asyncio.sleep(random.uniform(0.08, 0.45))
+
+                    if DRY_RUN:
+                        log(f"[DRY_RUN] Would click 'Following' for {username} (then confirm Unfollow)")
                     else:
-                        log("No confirm button found (maybe immediate unfollow).", style="yellow")
+                        # click press + release
+                        await client.send("Input.dispatchMouseEvent", {"type": "mousePressed", "x": bx, "y": by, "button": "left", "clickCount": 1})
+                        await asyncio.sleep(random.uniform(0.06, 0.18))
+                        await client.send("Input.dispatchMouseEvent", {"type": "mouseReleased", "x": bx, "y": by, "button": "left", "clickCount": 1})
+                        log(f"Clicked initial button for {username}", style="green")
+                        rects_stale = True
+
+                        # wait & detect confirm dialog
+                        await asyncio.sleep(random.uniform(0.6, 1.2))
+                        if await _block_text_present(page):
+                            log("Block-like text detected. Stopping.", style="bold red")
+                            await client.detach()
+                            return
+
+                        # find confirm button by label text
+                        confirm_btn = None
+                        for c in await page.query_selector_all("button"):
+                            try:
+                                t = (await c.inner_text()) or ""
+                            except Exception:
+                                t = ""
+                            if _CONFIRM_RE.search(t):
+                                confirm_btn = c
+                                break
+
+                        if confirm_btn:
+                            cbox = await confirm_btn.bounding_box()
+                            if cbox:
+                                cbx = cbox["x"] + cbox["width"] / 2
+                                cby = cbox["y"] + cbox["height"] / 2
+                                await _highlight_box(page, cbox, "#34c759", 700)
+                                path = generate_curved_path(mouse_x, mouse_y, cbx, cby, steps=random.randint(12, 20))
+                                mouse_x, mouse_y = await move_mouse_along(client, path, (0.008, 0.02))
+                                await asyncio.sleep(random.uniform(0.06, 0.2))
+                                await client.send("Input.dispatchMouseEvent", {"type": "mousePressed", "x": cbx, "y": cby, "button": "left", "clickCount": 1})
+                                await asyncio.sleep(random.uniform(0.06, 0.2))
+                                await client.send("Input.dispatchMouseEvent", {"type": "mouseReleased", "x": cbx, "y": cby, "button": "left", "clickCount": 1})
+                                log("Clicked confirm unfollow", style="green")
+                            else:
+                                log("Confirm button bbox missing; skipped confirm.", style="yellow")
+                        else:
+                            log("No confirm button found (maybe immediate unfollow).", style="yellow")
 
-                    # verify the row button changed to 'Follow/Ikuti'
-                    verified = False
-                    for _ in range(5):
+                        # verify the row button changed to 'Follow/Ikuti' (polled in-page for up to 2.5s)
                         try:
-                            row_link = await page.query_selector(f"a[role='link'][href='/{username}/']")
-                            if row_link:
-                                new_container = await row_link.query_selector("xpath=ancestor-or-self::div[.//button][1]")
-                                if new_container:
-                                    row_buttons = await new_container.query_selector_all("button")
-                                    for rb in row_buttons:
-                                        try:
-                                            t2 = ((await rb.inner_text()) or "").strip().lower()
-                                        except Exception:
-                                            t2 = ""
-                                        if any(k in t2 for k in FOLLOW_TOKENS):
-                                            verified = True
-                                            break
-                            if verified:
-                                break
+                            await page.wait_for_function(
+                                VERIFY_FOLLOW_JS,
+                                arg={"u": username, "pat": _FOLLOW_RE.pattern},
+                                timeout=2500,
+                            )
+                            verified = True
                         except Exception:
-                            pass
-                        await asyncio.sleep(0.5)
+                            verified = False
 
-                    if verified:
-                        log("Verified state changed to 'Follow/Ikuti'.", style="green")
-                    else:
-                        log("WARN: Could not verify state change to 'Follow/Ikuti' — counting with caution.", style="yellow")
-
-                    # update state on actual actions
-                    state["daily_unfollows"][today] = state["daily_unfollows"].get(today, 0) + 1
-                    state["total"] = state.get("total", 0) + 1
-                    recent_actions.append(time.time())
-                    save_state(state)
-                    log(f"Persisted: daily[{today}]={state['daily_unfollows'][today]} total={state['total']}", style="dim")
-                    unfollowed_usernames.append(username)
-                    processed_usernames.add(username)
-
-                actions += 1
-
-                # delay between actions
-                delay = random.uniform(MIN_DELAY_SEC, MAX_DELAY_SEC)
-                log(f"Sleeping ~{int(delay)}s before next action (actions={actions}).", style="dim")
-                slept = 0.0
-                while slept < delay:
-                    if killswitch_triggered():
-                        log("Killswitch detected during sleep.")
-                        break
-                    await asyncio.sleep(1.0)
-                    slept += 1.0
+                        if verified:
+                            log("Verified state changed to 'Follow/Ikuti'.", style="green")
+                        else:
+                            log("WARN: Could not verify state change to 'Follow/Ikuti' — counting with caution.", style="yellow")
+
+                        # update state on actual actions
+                        daily_count += 1
+                        state["daily_unfollows"][today] = daily_count
+                        state["total"] = state.get("total", 0) + 1
+                        recent_actions.append(time.time())
+                        unsaved += 1
+                        if unsaved >= STATE_FLUSH_EVERY:
+                            save_state(state)
+                            unsaved = 0
+                            log(f"Persisted: daily[{today}]={daily_count} total={state['total']}", style="dim")
+                        unfollowed_usernames.append(username)
+                        processed_usernames.add(username)
 
-                # Removed occasional natural scroll to avoid closing dialog or page scroll
+                    actions += 1
 
-                # post-action block check
-                body_text = (await page.inner_text("body")).lower()
-                if any(p in body_text for p in BLOCK_PATTERNS):
-                    log("Block-like text detected after action. Stopping.", style="bold red")
-                    try:
-                        progress.stop()
-                    except Exception:
-                        pass
-                    await client.detach()
-                    return
+                    # last target of this batch: no more clicks follow in this pass, so start loading
+                    # the next rows now and let the fetch overlap the delay below
+                    if btn is candidates[-1][0]:
+                        prefetch = asyncio.create_task(_load_more_rows(client, following_btns[-1][0], scroll_x, scroll_y))
 
-                if state["daily_unfollows"][today] >= DAILY_CAP:
-                    log("Reached DAILY_CAP after action. Stopping.")
-                    break
+                    # delay between actions
+                    delay = random.uniform(MIN_DELAY_SEC, MAX_DELAY_SEC)
+                    log(f"Sleeping ~{int(delay)}s before next action (actions={actions}).", style="dim")
+                    slept = 0.0
+                    while slept < delay:
+                        if killswitch_triggered():
+                            log("Killswitch detected during sleep.")
+                            break
+                        await asyncio.sleep(1.0)
+                        slept += 1.0
 
-            except Exception as e:
-                log(f"Error processing item: {e}", style="bold red")
-                await asyncio.sleep(1.0)
-                continue
+                    # Removed occasional natural scroll to avoid closing dialog or page scroll
+
+                    # post-action block check (DRY_RUN never clicks, so there is nothing to detect)
+                    if not DRY_RUN and await _block_text_present(page):
+                        log("Block-like text detected after action. Stopping.", style="bold red")
+                        await client.detach()
+                        return
 
-        # if we have processed as many unique usernames as reported in the initial header, finish
-        if before_count is not None and len(processed_usernames) >= before_count:
-            log(f"Processed {len(processed_usernames)} usernames (header reported {before_count}). Finishing to avoid loops.", style="cyan")
-            break
+                    if daily_count >= DAILY_CAP:
+                        log("Reached DAILY_CAP after action. Stopping.")
+                        break
 
-        # detect no-progress cycles (e.g., whitelists repeating)
-        if len(processed_usernames) == processed_before and actions == actions_before_loop:
-            no_action_rounds += 1
-        else:
-            no_action_rounds = 0
-        if no_action_rounds >= MAX_NO_PROGRESS_ROUNDS:
-            log("No new usernames processed after multiple cycles — ending to avoid whitelist loops.", style="yellow")
-            break
+                except Exception as e:
+                    log(f"Error processing item: {e}", style="bold red")
+                    await asyncio.sleep(1.0)
+                    continue
 
-        # load more: prefer scrolling last 'Following' button into view to keep position stable
-        try:
-            last_following = following_btns[-1] if 'following_btns' in locals() and following_btns else None
-            if last_following:
-                await last_following.scroll_into_view_if_needed()
-                await asyncio.sleep(random.uniform(0.8, 1.4))
+            # if we have processed as many unique usernames as reported in the initial header, finish
+            if before_count is not None and len(processed_usernames) >= before_count:
+                log(f"Processed {len(processed_usernames)} usernames (header reported {before_count}). Finishing to avoid loops.", style="cyan")
+                break
+
+            # detect no-progress cycles (e.g., whitelists repeating)
+            if len(processed_usernames) == processed_before and actions == actions_before_loop:
+                no_action_rounds += 1
             else:
-                await client.send("Input.dispatchMouseEvent", {"type": "mouseWheel", "x": scroll_x, "y": scroll_y, "deltaX": 0, "deltaY": random.randint(320, 520)})
-                await asyncio.sleep(random.uniform(0.9, 1.4))
-        except Exception:
-            pass
+                no_action_rounds = 0
+            if no_action_rounds >= MAX_NO_PROGRESS_ROUNDS:
+                log("No new usernames processed after multiple cycles — ending to avoid whitelist loops.", style="yellow")
+                break
 
-        # Update progress details for the bar
-        try:
-            processed = len(processed_usernames)
-            rem = (before_count - processed) if before_count is not None else "?"
-            detail = f"proc:{processed} unf:{len(unfollowed_usernames)} skip:{len(skipped_whitelist_usernames)} rem:{rem} act:{actions}"
-            # If total unknown initially and now known, set it
-            if before_count is not None and progress.tasks[0].total is None:
-                progress.update(task, total=before_count)
-            completed_val = processed if before_count is not None else 0
-            progress.update(task, completed=completed_val, fields={"detail": detail})
-        except Exception:
-            pass
+            # load more (already in flight if it was started during the last action's delay)
+            if prefetch is None:
+                prefetch = asyncio.create_task(_load_more_rows(client, following_btns[-1][0] if following_btns else None, scroll_x, scroll_y))
+            await prefetch
 
-        # end-of-list detection: Suggested header present inside dialog (confirm Follow buttons after it)
-        if has_dialog and not following_btns:
+            # Update progress details for the bar
+            processed = len(processed_usernames)
             try:
-                dlg = await page.query_selector(FOLLOWING_DIALOG_SELECTOR)
-                if dlg:
-                    headers = await dlg.query_selector_all("h4, h3, span")
-                    for h in headers:
-                        try:
-                            ht = ((await h.inner_text()) or "").strip().lower()
-                        except Exception:
-                            ht = ""
-                        if any(tok in ht for tok in SUGGESTED_HEADER_TOKENS):
-                            suggested_reached = False
-                            try:
-                                btns_after = await h.query_selector_all("xpath=following::button")
-                                for bb in btns_after[:20]:
-                                    try:
-                                        tbb = ((await bb.inner_text()) or "").strip().lower()
-                                    except Exception:
-                                        tbb = ""
-                                    if any(tt in tbb for tt in FOLLOW_TOKENS):
-                                        suggested_reached = True
-                                        break
-                            except Exception:
-                                pass
-                            if suggested_reached:
-                                hbox = await h.bounding_box()
-                                await _highlight_box(page, hbox, "#0a84ff", 800)
-                                log("Detected 'Suggested for you' with Follow buttons after it — finishing.", style="cyan")
-                                stable_no_new = 999
-                                break
+                rem = (before_count - processed) if before_count is not None else "?"
+                unf, skip = len(unfollowed_usernames), len(skipped_whitelist_usernames)
+                counts = (processed, unf, skip, rem, actions)
+                if counts != last_counts:
+                    last_counts = counts
+                    detail = f"proc:{processed} unf:{unf} skip:{skip} rem:{rem} act:{actions}"
+                # If total unknown initially and now known, set it
+                if not total_set and before_count is not None:
+                    progress.update(task, total=before_count)
+                    total_set = True
+                completed_val = processed if before_count is not None else 0
+                progress.update(task, completed=completed_val, detail=detail)
             except Exception:
                 pass
 
-        # check if more buttons are appearing as we scroll; if not, end gracefully
-        new_buttons = await page.query_selector_all(buttons_selector)
-        if len(new_buttons) == last_visible:
-            stable_no_new += 1
-        else:
-            stable_no_new = 0
-        last_visible = len(new_buttons)
-        if stable_no_new >= MAX_NO_PROGRESS_ROUNDS:
-            log("No new buttons loaded after multiple scrolls. Ending.", style="yellow")
-            break
+            # check if more buttons are appearing as we scroll
+            visible = await _call_js(page, BUTTON_COUNT_JS, dlg_handle if has_dialog else None, buttons_selector)
+            if visible == last_visible:
+                stable_no_new += 1
+            else:
+                stable_no_new = 0
+            last_visible = visible
+
+            # end-of-list detection, only once the list stopped growing: Suggested header present
+            # inside dialog (confirm Follow buttons after it)
+            if has_dialog and stable_no_new >= 1:
+                hbox = await _suggested_end_box(page, dlg_handle)
+                if hbox:
+                    _fire_and_forget(_highlight_box(page, hbox, "#0a84ff", 800))
+                    log("Detected 'Suggested for you' with Follow buttons after it — finishing.", style="cyan")
+                    break
+
+            # still no new buttons after multiple scrolls: end gracefully
+            if stable_no_new >= MAX_NO_PROGRESS_ROUNDS:
+                log("No new buttons loaded after multiple scrolls. Ending.", style="yellow")
+                break
+    finally:
+        # every exit (break, block-detection return, exception) stops the bar here
+        try:
+            progress.stop()
+        except Exception:
+            pass
+        if prefetch is not None and not prefetch.done():
+            prefetch.cancel()
+        page.remove_listener("framenavigated", _drop_dialog_on_nav)
+        if unsaved:
+            save_state(state)
+            log(f"Persisted: daily[{today}]={daily_count} total={state['total']}", style="dim")
 
     # summary
-    try:
-        progress.stop()
-    except Exception:
-        pass
-    # attempt to close dialog, reload page, and measure following count reliably
+    # close the dialog first (Escape restores the profile URL), then re-measure the following count
+    # in the background while the summary is logged and the CDP session detached
     await _close_dialog_if_open(page)
-    try:
-        await page.reload()
-        await page.wait_for_load_state("networkidle")
-    except Exception:
-        pass
-    after_count = None
-    for _ in range(3):
-        after_count = await _get_following_count(page)
-        if after_count is not None:
-            break
-        await asyncio.sleep(0.6)
+    count_task = asyncio.create_task(_following_count_after_run(page, profile_user))
     proc_total = len(processed_usernames)
     log(f"Summary: Processed {proc_total} accounts (unf:{len(unfollowed_usernames)} skip:{len(skipped_whitelist_usernames)})", style="cyan")
     if unfollowed_usernames:
@@ -794,6 +1010,12 @@ async def run_once() -> None:
         sample = ", ".join(skipped_whitelist_usernames[:30])
         more = "" if len(skipped_whitelist_usernames) <= 30 else f" (+{len(skipped_whitelist_usernames)-30} more)"
         log(f"Summary: Skipped (whitelist) {len(skipped_whitelist_usernames)} accounts: {sample}{more}")
+    try:
+        await client.detach()
+    except Exception:
+        pass
+
+    after_count = await count_task
     if before_count is not None or after_count is not None:
         log(f"Following count before -> after: {before_count} -> {after_count}")
         if before_count is not None:
@@ -801,10 +1023,6 @@ async def run_once() -> None:
             if after_count is not None and after_count != expected_after:
                 log(f"Note: Expected after-count ~{expected_after} based on actions; measured {after_count}. This can lag due to UI caching. Manual refresh usually reconciles.")
 
-    try:
-        await client.detach()
-    except Exception:
-        pass
     # Stop Playwright connection (do not close the external Chrome)
     try:
         await pw.stop()
@@ -813,17 +1031,29 @@ async def run_once() -> None:
 
 
 async def main() -> None:
-    log("=== Playwright Unfollow Tool START ===", style="bold cyan")
-    log(f"DRY_RUN={DRY_RUN}; using whitelist file '{WHITELIST_FILE}'", style="cyan")
+    global _LOG_QUEUE
+    _get_log_fh()  # open LOG_FILE up front so a bad path fails here, not inside the writer task
+    queue: asyncio.Queue = asyncio.Queue()
+    writer = asyncio.create_task(_log_writer(queue))
+    _LOG_QUEUE = queue
     try:
-        await run_once()
-    except asyncio.CancelledError:
-        log("Cancelled — exiting.")
-    except KeyboardInterrupt:
-        log("KeyboardInterrupt — exiting.")
-    except Exception as e:
-        log(f"Fatal error: {e}")
-    log("=== FINISHED ===")
+        log("=== Playwright Unfollow Tool START ===", style="bold cyan")
+        log(f"DRY_RUN={DRY_RUN}; using whitelist file '{WHITELIST_FILE}'", style="cyan")
+        try:
+            await run_once()
+        except asyncio.CancelledError:
+            log("Cancelled — exiting.")
+        except KeyboardInterrupt:
+            log("KeyboardInterrupt — exiting.")
+        except Exception as e:
+            log(f"Fatal error: {e}")
+        log("=== FINISHED ===")
+    finally:
+        # flush everything queued, then fall back to direct writes
+        _LOG_QUEUE = None
+        if not writer.done():
+            await queue.join()
+        writer.cancel()
 
 
 if __name__ == "__main__":